@@ -0,0 +1,44 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from config_store import ConfigStore
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == '__main__':
+    # Work on a copy so the sidecars and exports don't touch the real config
+    folder = tempfile.mkdtemp()
+    for name in ('keywords', 'URLs'):
+        shutil.copytree(os.path.join(ROOT, name), os.path.join(folder, name))
+    companies = sorted(os.path.splitext(f)[0] for f in os.listdir(os.path.join(folder, 'keywords')) if f.endswith('.xlsx'))
+
+    print(f"{'company':>16} {'pandas':>9} {'import':>9} {'sidecar':>9} {'cached':>9} {'add':>9}  (ms)")
+    for company in companies:
+        def pandas_load():
+            pd.read_excel(os.path.join(folder, 'keywords', f'{company}.xlsx'))
+            pd.read_excel(os.path.join(folder, 'URLs', f'{company}.xlsx'))
+
+        # The old add/remove handlers read and reloaded both workbooks on every click
+        legacy = timed(pandas_load) * 2
+        store = ConfigStore(folder, export_delay=60)
+        imported = timed(lambda: store.load(company))
+        fresh = ConfigStore(folder, export_delay=60)
+        sidecar = timed(lambda: fresh.load(company))
+        cached = timed(lambda: fresh.load(company))
+        add = timed(lambda: fresh.add(company, 'keywords', 'benchmark keyword'))
+        for timer in list(fresh.timers.values()):
+            timer.cancel()
+        print(f'{company:>16} {legacy:9.2f} {imported:9.2f} {sidecar:9.2f} {cached:9.2f} {add:9.2f}')
+    shutil.rmtree(folder)
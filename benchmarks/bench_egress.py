@@ -0,0 +1,71 @@
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rank
+from stub_proxy import start_stub_proxy
+from stub_server import start_stub_server
+
+
+def unused_port():
+    # A port nothing listens on, to stand in for a dead proxy
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run keywords through an adaptive proxy pool of local stub proxies')
+    parser.add_argument('--keywords', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=2.0, help='starting requests per second per proxy')
+    parser.add_argument('--cooldown', type=float, default=2.0, help='first cooldown of a blocked proxy')
+    parser.add_argument('--limit', type=int, default=30, help='requests per 10s the strict proxy allows')
+    parser.add_argument('--block-rate', type=float, default=0.1, help='share of requests the flaky proxy blocks')
+    args = parser.parse_args()
+
+    server, search_url = start_stub_server(delay=0.02)
+    strict, strict_url = start_stub_proxy(limit=args.limit, window=10.0, block_for=5.0)
+    flaky, flaky_url = start_stub_proxy(block_rate=args.block_rate)
+    healthy, healthy_url = start_stub_proxy()
+    proxies = [strict_url, flaky_url, healthy_url, f'http://127.0.0.1:{unused_port()}']
+
+    rank.use_proxies(proxies, rate=args.rate, burst=1, max_rate=20.0, cooldown=args.cooldown, max_cooldown=30.0)
+    for sessions in rank.device_sessions.values():
+        # Leave every proxy's retries to the pool
+        sessions.max_retries = len(proxies) * 2
+
+    output_folder = tempfile.mkdtemp(prefix='bench_egress_')
+    rate_limited = []
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            summary = rank.run_company(
+                'bench', [f'keyword {i}' for i in range(args.keywords)], ['https://propwiser.com.hk/'],
+                on_rate_limit=lambda queries: rate_limited.extend(queries) or 'retry',
+                output_folder=output_folder,
+                search_url=search_url,
+                concurrency=args.concurrency,
+                history=None,
+                cache=None,
+            )
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+
+    print(f"{summary['completed']}/{args.keywords} keywords in {elapsed:.1f}s ({summary['completed'] / elapsed:.1f} keywords/s), "
+          f"{len(rate_limited)} rate limited queries reached the run")
+    labels = {strict_url: 'strict', flaky_url: 'flaky', healthy_url: 'healthy'}
+    for stats in rank.egress_pool.stats():
+        label = labels.get(stats['egress'], 'dead')
+        print(f"{label:>8}: {json.dumps({k: round(v, 2) if isinstance(v, float) else v for k, v in stats.items() if k != 'egress'})}")
+    for proxy_server in (strict, flaky, healthy, server):
+        proxy_server.shutdown()
@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rank import get_data
+from fetcher import FetchScheduler
+from stub_server import start_stub_server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the serial keyword loop with the fetch scheduler')
+    parser.add_argument('--keywords', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.2, help='simulated server latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0, help='requests per second per host, 0 for unlimited')
+    args = parser.parse_args()
+
+    server, search_url = start_stub_server(delay=args.delay)
+    keywords = [f'keyword{i}' for i in range(args.keywords)]
+    site_names = ['https://propwiser.com.hk/']
+
+    start = time.perf_counter()
+    for keyword in keywords:
+        get_data(keyword, site_names, search_url=search_url, cache=None)
+    serial = time.perf_counter() - start
+
+    scheduler = FetchScheduler(
+        lambda keyword: get_data(keyword, site_names, search_url=search_url, cache=None),
+        concurrency=args.concurrency,
+        rate=args.rate,
+        burst=args.concurrency,
+    )
+    start = time.perf_counter()
+    done = sum(1 for _ in scheduler.run(keywords))
+    parallel = time.perf_counter() - start
+
+    server.shutdown()
+    print(f'serial:    {serial:.2f}s ({args.keywords / serial:.1f} keywords/s)')
+    print(f'scheduled: {parallel:.2f}s ({done / parallel:.1f} keywords/s, concurrency {args.concurrency})')
@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from site_matcher import SiteMatcher
+
+
+def legacy_first_rank(site_names, urls):
+    # The original rank_check loop: substring search for every site on every result
+    for rank, url in enumerate(urls, start=1):
+        for site_name in site_names:
+            if str(url).find(str(site_name)) != -1:
+                return rank
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the indexed site matcher with the nested substring loop')
+    parser.add_argument('--sites', type=int, default=5000)
+    parser.add_argument('--results', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    site_names = [f'https://site{i}.example.com/' for i in range(args.sites)]
+    pages = []
+    for _ in range(args.pages):
+        # Mostly unrelated results with the odd target site, like a real result page
+        urls = [f'https://other{rng.randrange(10 ** 6)}.com/page/{j}' for j in range(args.results)]
+        if rng.random() < 0.5:
+            urls[rng.randrange(args.results)] = rng.choice(site_names) + 'some/path'
+        pages.append(urls)
+
+    start = time.perf_counter()
+    matcher = SiteMatcher(site_names)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [matcher.match(urls)[0] for urls in pages]
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = [legacy_first_rank(site_names, urls) for urls in pages]
+    legacy_time = time.perf_counter() - start
+
+    if indexed != legacy:
+        print('Mismatch: indexed matcher and legacy loop disagree')
+    print(f'{args.sites} sites, {args.pages} pages of {args.results} results')
+    print(f'index build: {build * 1000:8.1f} ms')
+    print(f'indexed:     {args.pages / indexed_time:8.1f} pages/s')
+    print(f'legacy:      {args.pages / legacy_time:8.1f} pages/s')
+    sys.exit(1 if indexed != legacy else 0)
@@ -0,0 +1,56 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rank
+from fetcher import FetchScheduler, PageStats
+from run_journal import is_found
+from stub_server import start_stub_server
+
+
+def run(keywords, site_names, search_url, paginated, concurrency):
+    rank.serp_stats = PageStats()
+    # Requests that actually went out, including retries and speculative pages thrown away
+    sent_before = rank.http_sessions.stats()['requests']
+    pages_pool = ThreadPoolExecutor(max_workers=concurrency * rank.SERP_PREFETCH_PAGES)
+    scheduler = FetchScheduler(
+        lambda keyword: rank.get_data(keyword, site_names, search_url=search_url, cache=None, paginated=paginated),
+        concurrency=concurrency,
+        rate=0,
+    )
+    rank.page_pool = pages_pool
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [desktop for _, desktop in scheduler.run(keywords)]
+    elapsed = time.perf_counter() - start
+    pages_pool.shutdown()
+    found = sum(1 for desktop in results if is_found(desktop.iloc[0]))
+    stats = rank.serp_stats.stats()
+    stats['requests_sent'] = rank.http_sessions.stats()['requests'] - sent_before
+    return stats, found, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Requests per keyword: paginated fetch vs one num=100 page')
+    parser.add_argument('--keywords', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--site', action='append', default=None, help='target site, can be given more than once')
+    args = parser.parse_args()
+
+    server, search_url = start_stub_server(delay=args.delay)
+    keywords = [f'keyword{i}' for i in range(args.keywords)]
+    site_names = args.site or ['https://propwiser.com.hk/']
+
+    for label, paginated in (('single-shot', False), ('paginated', True)):
+        stats, found, elapsed = run(keywords, site_names, search_url, paginated, args.concurrency)
+        print(f"{label:>12}: {stats['requests_sent'] / len(keywords):.2f} requests/keyword sent "
+              f"({stats['pages_per_keyword']:.2f} pages used, {stats['pages_wasted']} fetched ahead and discarded), "
+              f"{found}/{len(keywords)} found, {elapsed:.2f}s")
+    server.shutdown()
@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serp_parser import PARSERS, available_parsers, clean_url, parse_serp
+from serp_fixtures import CORPUS_FOLDER, load_corpus
+
+
+def parse_legacy(html):
+    # The original get_data loop: re-parse every result div just to find its link
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    data = []
+    for div in soup.find_all('div', class_="yuRUbf"):
+        anchor = BeautifulSoup(str(div), 'html.parser').find('a')
+        url = clean_url(anchor.get('href', "No URL") if anchor else "No URL")
+        if url is not None:
+            data.append(url)
+    return data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure pages per second for each SERP parser backend')
+    parser.add_argument('--corpus', default=CORPUS_FOLDER, help='folder of saved result pages (*.html)')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    backends = {'legacy': parse_legacy}
+    for name in available_parsers():
+        backends[name] = PARSERS[name][0]
+
+    # Every backend must find the same URLs as the original code
+    expected = [parse_legacy(page) for page in pages]
+    disagreeing = []
+    for name in available_parsers():
+        found = [[result.url for result in parse_serp(page, name)] for page in pages]
+        if found != expected:
+            print(f'Mismatch: {name} disagrees with the legacy parser')
+            disagreeing.append(name)
+
+    print(f'{len(pages)} pages, {args.rounds} rounds')
+    for name, parse in backends.items():
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for page in pages:
+                parse(page)
+        elapsed = time.perf_counter() - start
+        print(f'{name:>12}: {len(pages) * args.rounds / elapsed:8.1f} pages/s')
+    # A fast backend that ranks differently is a failure, not a footnote
+    sys.exit(1 if disagreeing else 0)
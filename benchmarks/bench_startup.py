@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules that used to be imported before the window could appear
+HEAVY_MODULES = ['pandas', 'openpyxl', 'requests']
+
+
+def child(eager):
+    # Time `import rank` and, when there is a display, until the window has been drawn
+    start = time.perf_counter()
+    if eager:
+        # What startup cost when these were imported at the top of rank.py
+        import importlib
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+    import rank
+    result = {'import': time.perf_counter() - start, 'window': None}
+    try:
+        app = rank.App()
+    except Exception as e:
+        # No display, e.g. on a headless server
+        result['error'] = str(e)
+    else:
+        app.update()
+        result['window'] = time.perf_counter() - start
+        app.destroy()
+    result['heavy_loaded'] = [name for name in HEAVY_MODULES if name in sys.modules]
+    return result
+
+
+def measure(runs, eager):
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child'] + (['--eager'] if eager else []),
+            cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time from launch until the window is up')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--eager', action='store_true', help='import pandas, openpyxl and requests up front for comparison')
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.eager)))
+        sys.exit(0)
+
+    for label, eager in (('lazy', False), ('eager imports', True)):
+        results = measure(args.runs, eager)
+        line = f"{label:>13}: import rank {statistics.median(r['import'] for r in results) * 1000:.0f}ms"
+        if all(r['window'] is not None for r in results):
+            line += f", window drawn {statistics.median(r['window'] for r in results) * 1000:.0f}ms"
+        else:
+            line += f" (no window: {results[0].get('error', 'no display')})"
+        line += f", whole process {statistics.median(r['process'] for r in results) * 1000:.0f}ms"
+        line += f", heavy modules loaded: {', '.join(results[0]['heavy_loaded']) or 'none'}"
+        print(line)
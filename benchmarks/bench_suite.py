@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serp_fixtures import CORPUS_FOLDER, record_corpus
+from stub_server import start_stub_server
+
+# Keyword counts the suite runs by default
+SIZES = [10, 1000, 100000]
+
+# Target sites of the benchmark company, all hosts the corpus pages link to
+SITES = ['https://propwiser.com.hk/', 'milliontech.com', 'www.openrice.com']
+
+
+def run_size(size, search_url, concurrency, backoff):
+    # One full run over `size` keywords: fetch, parse, match, journal and workbook.
+    # Runs in its own process so the peak RSS belongs to this size alone.
+    import rank
+    # rank imports these on first use, keep that one-off cost out of the timings
+    import pandas, requests, openpyxl  # noqa: F401
+
+    rank.FETCH_RATE_PER_HOST = 0
+    for sessions in rank.device_sessions.values():
+        sessions.backoff = backoff
+    keywords = [f'keyword {i}' for i in range(size)]
+    output_folder = tempfile.mkdtemp(prefix='bench_suite_')
+    try:
+        rank.run_metrics.reset()
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            summary = rank.run_company(
+                'bench', keywords, SITES,
+                on_rate_limit=lambda queries: 'retry',
+                output_folder=output_folder,
+                search_url=search_url,
+                concurrency=concurrency,
+                history=None,
+                cache=None,
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+    report = rank.run_metrics.report()
+    stages = report['stages']
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'keywords': size,
+        'completed': summary['completed'],
+        'seconds': elapsed,
+        'keywords_per_second': summary['completed'] / elapsed if elapsed else 0.0,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_mb': peak / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+        'p95': {stage: stages[stage]['p95'] for stage in ('query', 'download', 'parse', 'match', 'excel') if stage in stages},
+        'requests': report['counters'].get('requests', 0),
+        'responses_429': report['counters'].get('responses_429', 0),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Regressions against a saved run: slower throughput or a higher query p95
+    previous = {entry['keywords']: entry for entry in baseline}
+    problems = []
+    for entry in results:
+        old = previous.get(entry['keywords'])
+        if old is None:
+            continue
+        if entry['keywords_per_second'] < old['keywords_per_second'] * (1 - tolerance):
+            problems.append(f"{entry['keywords']} keywords: {entry['keywords_per_second']:.1f} keywords/s, was {old['keywords_per_second']:.1f}")
+        for stage, p95 in entry['p95'].items():
+            if stage in old['p95'] and p95 > old['p95'][stage] * (1 + tolerance):
+                problems.append(f"{entry['keywords']} keywords: {stage} p95 {p95 * 1000:.1f}ms, was {old['p95'][stage] * 1000:.1f}ms")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of a run against a local mock Google')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in SIZES), help='comma separated keyword counts')
+    parser.add_argument('--delay', type=float, default=0.05, help='simulated server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='up to this many extra seconds per response')
+    parser.add_argument('--rate-limit', type=float, default=0.01, help='share of requests answered with 429')
+    parser.add_argument('--backoff', type=float, default=0.05, help='retry backoff base of the session pools')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--record', metavar='CACHE', help='first copy real pages from a SERP cache into the corpus')
+    parser.add_argument('--save', help='write the results as JSON, e.g. to use as a baseline later')
+    parser.add_argument('--baseline', help='results saved earlier; exit 1 if this run is slower')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--search-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_size(args.child, args.search_url, args.concurrency, args.backoff)))
+        sys.exit(0)
+
+    if args.record:
+        print(f'Recorded {record_corpus(args.record)} pages into {CORPUS_FOLDER}')
+
+    server, search_url = start_stub_server(delay=args.delay, jitter=args.jitter, rate_limit=args.rate_limit)
+    results = []
+    try:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', str(size), '--search-url', search_url,
+                 '--concurrency', str(args.concurrency), '--backoff', str(args.backoff)],
+                check=True, stdout=subprocess.PIPE, text=True,
+            ).stdout
+            entry = json.loads(output.strip().splitlines()[-1])
+            results.append(entry)
+            p95 = ', '.join(f'{stage} {seconds * 1000:.1f}ms' for stage, seconds in entry['p95'].items())
+            print(f"{size:>7} keywords: {entry['keywords_per_second']:8.1f} keywords/s, peak RSS {entry['peak_rss_mb']:.0f} MB, "
+                  f"{entry['responses_429']} x 429, p95 {p95}")
+    finally:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f'Regression: {problem}')
+        sys.exit(1 if problems else 0)
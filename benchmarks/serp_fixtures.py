@@ -0,0 +1,106 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import sys
+import zlib
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serp_parser import parse_serp
+
+# Folder of saved Google result pages (*.html) used by the stub server and benchmarks
+CORPUS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serp_corpus')
+
+DOMAINS = [
+    'propwiser.com.hk', 'office.propwiser.com.hk', 'mannaltd.com.hk', 'milliontech.com',
+    'www.printrainbow.com.hk', 'decorcollection.com', 'www.wikipedia.org', 'www.youtube.com',
+    'www.facebook.com', 'www.instagram.com', 'hk.centanet.com', 'www.squarefoot.com.hk',
+    'www.28hse.com', 'www.midland.com.hk', 'www.openrice.com', 'www.ikea.com.hk',
+]
+
+
+def result_blocks(keyword, urls, start=0):
+    # Organic result markup for `urls`, numbered from `start`
+    blocks = []
+    for i, url in enumerate(urls, start):
+        domain = urlparse(url).netloc
+        blocks.append(
+            '<div class="g"><div class="yuRUbf"><div><span jscontroller="msmzHf">'
+            f'<a jsname="UWckNb" href="{url}" data-ved="2ahUKEwi{i}"><br>'
+            f'<h3 class="LC20lb MBeuO DKV0Md">{keyword} result {i} - {domain}</h3>'
+            f'<div class="notranslate"><cite>{domain}</cite></div></a></span></div></div>'
+            f'<div class="VwiC3b yXK7lf"><span>Snippet {i} about {keyword} on {domain}.</span></div></div>'
+        )
+    return (
+        '<!doctype html><html><head><title>' + keyword + ' - Google Search</title></head>'
+        '<body><div id="search"><div id="rso">' + ''.join(blocks) + '</div></div></body></html>'
+    )
+
+
+def synthetic_serp(keyword, results=100, seed=None, start=0):
+    # Build a page with the same markup Google uses for organic results. The same keyword
+    # always gets the same ranking, so start= pages line up with the full page.
+    rng = random.Random(seed if seed is not None else keyword)
+    domains = [rng.choice(DOMAINS) for _ in range(start + results)]
+    urls = [f'https://{domains[i]}/{keyword}/{i}' for i in range(start, start + results)]
+    return result_blocks(keyword, urls, start)
+
+
+def slice_serp(html, keyword, start, results):
+    # The organic results of a saved num=100 page from `start` on, as a page of their own, so
+    # start=/num= requests walk the same ranking a single num=100 request gets
+    urls = [result.url for result in parse_serp(html)]
+    return result_blocks(keyword, urls[start:start + results], start)
+
+
+# Per-request tokens Google puts in links and attributes, and addresses of a signed-in user
+TRACKING_PARAMS = re.compile(r'([?&](?:amp;)?(?:ved|ei|usg|sig|opi|sxsrf|sca_esv|sca_upv|iflsig|gs_lcrp|uact)=)[^&"\'\s<>]*')
+TRACKING_ATTRIBUTES = re.compile(r'\b(data-ved|data-ei|data-lk|ping)="[^"]*"')
+EMAIL_ADDRESS = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+
+def sanitize_serp(html):
+    # Strip what ties a saved page to the session that fetched it, leaving the markup as is
+    html = TRACKING_PARAMS.sub(r'\1x', html)
+    html = TRACKING_ATTRIBUTES.sub(r'\1="x"', html)
+    return EMAIL_ADDRESS.sub('user@example.com', html)
+
+
+def load_corpus(folder=CORPUS_FOLDER):
+    # Return the saved pages, falling back to a handful of synthetic ones
+    pages = []
+    if os.path.isdir(folder):
+        for file_name in sorted(os.listdir(folder)):
+            if file_name.endswith('.html'):
+                with open(os.path.join(folder, file_name), encoding='utf-8') as f:
+                    pages.append(f.read())
+    if not pages:
+        pages = [synthetic_serp(f'keyword{i}', seed=i) for i in range(20)]
+    return pages
+
+
+def page_for(keyword, pages):
+    # Pick the same page for the same keyword every time
+    digest = hashlib.md5(keyword.encode('utf-8')).hexdigest()
+    return pages[int(digest, 16) % len(pages)]
+
+
+def record_corpus(cache_path, folder=CORPUS_FOLDER, limit=200):
+    # Copy real num=100 first pages out of the checker's SERP cache into the corpus, sanitized
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    conn = sqlite3.connect(cache_path)
+    try:
+        rows = conn.execute(
+            'SELECT key, body FROM serp_cache WHERE num = 100 AND COALESCE(start, 0) = 0 ORDER BY created DESC LIMIT ?',
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    for key, body in rows:
+        with open(os.path.join(folder, f'{key[:16]}.html'), 'w', encoding='utf-8') as f:
+            f.write(sanitize_serp(zlib.decompress(body).decode('utf-8')))
+    return len(rows)
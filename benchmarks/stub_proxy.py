@@ -0,0 +1,81 @@
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(limit, window, block_for, block_rate):
+    # A forward proxy that gets "blocked" like a real egress IP: after `limit` requests
+    # within `window` seconds every request is answered with a 429 for `block_for`
+    # seconds, and a `block_rate` share of the others is blocked at random
+    state = {'sent': [], 'blocked_until': 0.0}
+    lock = threading.Lock()
+    # Go straight to the target, never through a proxy from the environment
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def blocked(self):
+            now = time.monotonic()
+            with lock:
+                if now < state['blocked_until']:
+                    return True
+                state['sent'] = [sent for sent in state['sent'] if sent > now - window]
+                if limit and len(state['sent']) >= limit:
+                    state['blocked_until'] = now + block_for
+                    return True
+                state['sent'].append(now)
+            return block_rate and random.random() < block_rate
+
+        def reply(self, status, body, content_type='text/html; charset=utf-8'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Plain HTTP proxying: the request line carries the absolute URL
+            if self.blocked():
+                self.reply(429, b'<html><body>Our systems have detected unusual traffic</body></html>')
+                return
+            try:
+                with opener.open(self.path, timeout=30) as response:
+                    self.reply(response.status, response.read(), response.headers.get('Content-Type', 'text/html'))
+            except urllib.error.HTTPError as e:
+                self.reply(e.code, e.read())
+
+        def log_message(self, format, *args):
+            pass
+
+    return ProxyHandler
+
+
+def start_stub_proxy(port=0, limit=0, window=10.0, block_for=30.0, block_rate=0.0):
+    # Start the proxy on a background thread and return it with its proxy URL
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(limit, window, block_for, block_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Forward proxy that gets rate limited like a real egress IP')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--limit', type=int, default=0, help='requests allowed per window before blocking, 0 for no limit')
+    parser.add_argument('--window', type=float, default=10.0)
+    parser.add_argument('--block-for', type=float, default=30.0, help='seconds a block lasts')
+    parser.add_argument('--block-rate', type=float, default=0.0, help='share of requests blocked at random')
+    args = parser.parse_args()
+
+    server, url = start_stub_proxy(args.port, args.limit, args.window, args.block_for, args.block_rate)
+    print(f'Proxying at {url}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,75 @@
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from serp_fixtures import load_corpus, page_for, slice_serp
+
+
+def make_handler(pages, delay, jitter=0.0, rate_limit=0.0, retry_after=None):
+    # delay plus up to `jitter` seconds of latency per request; a `rate_limit` share of the
+    # requests is answered with a 429 like Google's, with Retry-After if given
+    class StubHandler(BaseHTTPRequestHandler):
+        # Answer every /search request with a saved result page
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            keyword = query.get('q', [''])[0]
+            if delay or jitter:
+                time.sleep(delay + random.uniform(0, jitter))
+            if rate_limit and random.random() < rate_limit:
+                body = b'<html><body>Our systems have detected unusual traffic</body></html>'
+                self.send_response(429)
+                if retry_after is not None:
+                    self.send_header('Retry-After', str(retry_after))
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            num = int(query.get('num', ['100'])[0])
+            start = int(query.get('start', ['0'])[0])
+            if start or num != 100:
+                # Paginated requests get the keyword's page cut into slices, ranked the same
+                body = slice_serp(page_for(keyword, pages), keyword, start, num).encode('utf-8')
+            else:
+                body = page_for(keyword, pages).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, pages=None, delay=0.0, jitter=0.0, rate_limit=0.0, retry_after=None):
+    # Start the server on a background thread and return it with its search URL
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(pages or load_corpus(), delay, jitter, rate_limit, retry_after))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/search'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve saved Google result pages locally')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before each response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per response')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='share of requests answered with 429, e.g. 0.01')
+    parser.add_argument('--retry-after', type=int, help='Retry-After seconds sent with each 429')
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, delay=args.delay, jitter=args.jitter, rate_limit=args.rate_limit, retry_after=args.retry_after)
+    print(f'Serving result pages at {url}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
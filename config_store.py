@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+
+# Folder of the JSON sidecars that mirror keywords/*.xlsx and URLs/*.xlsx
+CONFIG_FOLDER = 'config'
+
+# The two workbooks of a company, by sidecar key: (folder, column header)
+WORKBOOKS = {
+    'keywords': ('keywords', 'Keyword'),
+    'sites': ('URLs', 'Name'),
+}
+
+
+def _blank(value):
+    # Empty cells, including the NaN pandas used to read them as
+    return value is None or (isinstance(value, float) and value != value) or str(value).strip() == ''
+
+
+class ConfigStore:
+    # Keeps each company's keywords and target sites in memory after the first load.
+    # Edits update memory and a small JSON sidecar straight away; the .xlsx files stay the
+    # import/export format and are rewritten in the background shortly after an edit.
+    # If an .xlsx file is edited by hand it is imported again on the next load.
+    def __init__(self, base_folder='.', export_delay=1.0):
+        self.base_folder = base_folder
+        self.export_delay = export_delay
+        self.companies = {}
+        self.load_times = {}
+        self.timers = {}
+        self.index = {}
+        self.lock = threading.RLock()
+
+    def xlsx_path(self, company, kind):
+        return os.path.join(self.base_folder, WORKBOOKS[kind][0], f'{company}.xlsx')
+
+    def sidecar_path(self, company):
+        return os.path.join(self.base_folder, CONFIG_FOLDER, f'{company}.json')
+
+    def _mtime(self, path):
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def _import_xlsx(self, path, header):
+        # Read the single column under `header`, skipping blank cells
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            columns = next(rows, ())
+            if header not in columns:
+                return []
+            index = columns.index(header)
+            return [row[index] for row in rows if len(row) > index and not _blank(row[index])]
+        finally:
+            workbook.close()
+
+    def company_names(self, folder=None):
+        # Companies that have a keywords workbook. The listing is cached against the folder's
+        # mtime, which changes whenever a workbook is added, removed or renamed.
+        folder = os.path.join(self.base_folder, folder or WORKBOOKS['keywords'][0])
+        mtime = self._mtime(folder)
+        with self.lock:
+            cached = self.index.get(folder)
+            if cached is not None and cached[0] == mtime:
+                return list(cached[1])
+        names = [os.path.splitext(file_name)[0] for file_name in os.listdir(folder) if file_name.endswith('.xlsx')]
+        with self.lock:
+            self.index[folder] = (mtime, names)
+        return list(names)
+
+    def load(self, company):
+        # Return the cached config, loading it from the sidecar or the workbooks the first time.
+        # The workbooks' mtimes are checked on every call, so one edited by hand while the app
+        # is running is imported again.
+        with self.lock:
+            start = time.perf_counter()
+            mtimes = {kind: self._mtime(self.xlsx_path(company, kind)) for kind in WORKBOOKS}
+            config = self.companies.get(company)
+            if config is not None:
+                # A workbook with an export still pending is about to be overwritten by our edits
+                changed = [kind for kind in WORKBOOKS
+                           if mtimes[kind] is not None and mtimes[kind] != config['xlsx_mtime'].get(kind)
+                           and (company, kind) not in self.timers]
+                if changed:
+                    for kind in changed:
+                        config[kind] = self._import_xlsx(self.xlsx_path(company, kind), WORKBOOKS[kind][1])
+                        config['xlsx_mtime'][kind] = mtimes[kind]
+                    self._save_sidecar(company)
+                    self.load_times[company] = time.perf_counter() - start
+                return config
+
+            sidecar = None
+            if os.path.exists(self.sidecar_path(company)):
+                with open(self.sidecar_path(company), encoding='utf-8') as f:
+                    sidecar = json.load(f)
+
+            config = {}
+            for kind, (folder, header) in WORKBOOKS.items():
+                if sidecar is not None and (mtimes[kind] is None or sidecar['xlsx_mtime'].get(kind) == mtimes[kind]):
+                    # The workbook hasn't changed since we last saw it, the sidecar is up to date
+                    config[kind] = sidecar[kind]
+                elif mtimes[kind] is not None:
+                    config[kind] = self._import_xlsx(self.xlsx_path(company, kind), header)
+                else:
+                    raise FileNotFoundError(f'File not found: {self.xlsx_path(company, kind)}')
+            config['xlsx_mtime'] = mtimes
+
+            self.companies[company] = config
+            if sidecar is None or any(config[kind] != sidecar.get(kind) for kind in WORKBOOKS):
+                self._save_sidecar(company)
+            self.load_times[company] = time.perf_counter() - start
+            return config
+
+    def keywords(self, company):
+        return list(self.load(company)['keywords'])
+
+    def sites(self, company):
+        return list(self.load(company)['sites'])
+
+    def add(self, company, kind, value):
+        with self.lock:
+            self.load(company)[kind].append(value)
+            self._changed(company, kind)
+
+    def remove(self, company, kind, value):
+        # Remove every occurrence, like filtering the column did
+        with self.lock:
+            config = self.load(company)
+            # The listboxes hand back strings, so compare as text
+            config[kind] = [item for item in config[kind] if str(item) != str(value)]
+            self._changed(company, kind)
+
+    def _changed(self, company, kind):
+        self._save_sidecar(company)
+        self._schedule_export(company, kind)
+
+    def _save_sidecar(self, company):
+        path = self.sidecar_path(company)
+        folder = os.path.dirname(path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.companies[company], f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _schedule_export(self, company, kind):
+        # Coalesce quick successive edits into one workbook write
+        key = (company, kind)
+        if key in self.timers:
+            self.timers[key].cancel()
+        self.timers[key] = threading.Timer(self.export_delay, self.export, (company, kind))
+        self.timers[key].start()
+
+    def export(self, company, kind):
+        # Write the column back in the existing .xlsx layout, atomically
+        with self.lock:
+            # Load while the timer is still registered, so a hand edit can't replace our edits
+            values = list(self.load(company)[kind])
+            self.timers.pop((company, kind), None)
+        from openpyxl import Workbook
+
+        header = WORKBOOKS[kind][1]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Sheet1')
+        sheet.append([header])
+        for value in values:
+            sheet.append([value])
+        path = self.xlsx_path(company, kind)
+        tmp_path = path + '.tmp'
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+        with self.lock:
+            # Remember the new mtime so the next load doesn't import our own write
+            self.companies[company]['xlsx_mtime'][kind] = self._mtime(path)
+            self._save_sidecar(company)
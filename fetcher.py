@@ -0,0 +1,356 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class TokenBucket:
+    # Classic token bucket: refills `rate` tokens per second up to `capacity`
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        # Take a token if one is available, otherwise return the seconds until there is one
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def acquire(self, stop_event=None):
+        # Block until a token is available; return False if stop_event fires first
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+
+class HostRateLimiter:
+    # One token bucket per host, so a slow host never throttles a different one
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, host, stop_event=None):
+        if not self.rate:
+            # A rate of 0/None disables rate limiting
+            return True
+        return self.bucket(host).acquire(stop_event)
+
+
+class FetchScheduler:
+    # Runs `fetch(item)` for many items on a bounded thread pool and yields
+    # (item, result) pairs in completion order, so callers can stream them out.
+    # A fetch that raises yields the exception as its result instead.
+    def __init__(self, fetch, concurrency=4, rate=1.0, burst=1, host_of=None, budget=None):
+        self.fetch = fetch
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = HostRateLimiter(rate, burst)
+        self.host_of = host_of or (lambda item: None)
+        # Optional TokenBucket shared with other schedulers, e.g. a global request budget
+        self.budget = budget
+        self.stop_event = threading.Event()
+        self.futures = {}
+
+    def throttle(self, item):
+        # Wait for the host's rate limit and the shared budget; False once stop() is called.
+        # Fetches that make extra requests for an item (e.g. more result pages) call this too.
+        if self.stop_event.is_set() or not self.limiter.acquire(self.host_of(item), self.stop_event):
+            return False
+        return self.budget is None or self.budget.acquire(self.stop_event)
+
+    def _run_one(self, item):
+        # Wait for the rate limits before touching the network
+        if not self.throttle(item):
+            return None
+        try:
+            return self.fetch(item)
+        except Exception as e:
+            # Hand the error to the caller rather than raising it out of run()
+            return e
+
+    def run(self, items):
+        self.stop_event.clear()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            self.futures = {executor.submit(self._run_one, item): item for item in items}
+            pending = set(self.futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    # Items skipped because of stop() come back as None, don't report them
+                    if self.stop_event.is_set() and future.result() is None:
+                        continue
+                    yield self.futures[future], future.result()
+        finally:
+            # Also reached when the caller raises or stops iterating: drop the queued items
+            # instead of running every one of them before returning
+            self.stop()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self):
+        # Cancel everything that hasn't started; in-flight fetches still finish and are yielded
+        self.stop_event.set()
+        for future in self.futures:
+            future.cancel()
+
+
+def timed_adapter(metrics, **kwargs):
+    # An HTTPAdapter whose connections report how long DNS, TCP and TLS setup took as the
+    # 'connect' stage; requests has no hook for this, so swap in urllib3 subclasses
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            with metrics.timer('connect'):
+                super().connect()
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            with metrics.timer('connect'):
+                super().connect()
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    pool_classes = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    class TimedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **pool_kwargs):
+            super().init_poolmanager(*args, **pool_kwargs)
+            self.poolmanager.pool_classes_by_scheme = pool_classes
+
+        def proxy_manager_for(self, proxy, **proxy_kwargs):
+            manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+            if not proxy.lower().startswith('socks'):
+                # SOCKS proxies need urllib3's own SOCKS connection classes
+                manager.pool_classes_by_scheme = pool_classes
+            return manager
+
+    return TimedAdapter(**kwargs)
+
+
+class SessionPool:
+    # Keeps a pool of keep-alive requests.Sessions that worker threads check out
+    # for one request at a time. The user agent is picked once per session, so it
+    # rotates per connection instead of per request. 429 and 5xx responses are
+    # retried with exponential backoff and full jitter, and so are connection errors and
+    # timeouts (pass timeout= through get()). A 429 waits at least `backoff` seconds, and
+    # with throttle= every retry also waits for the caller's rate limits. With a metrics.Metrics every
+    # attempt is timed (connect, server response, body download) and counted. With an
+    # egress.EgressPool every attempt goes out through the proxy the pool picks, and a
+    # blocked or failing proxy is retried straight away through another one.
+    def __init__(self, user_agents, max_retries=3, backoff=1.0, max_backoff=30.0, metrics=None, egress=None):
+        self.user_agents = list(user_agents)
+        self.metrics = metrics
+        self.egress = egress
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle = []
+        self.sessions = []
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def checkout(self):
+        # requests is only imported once the first request is made
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            session = requests.Session()
+            if self.metrics is not None:
+                adapter = timed_adapter(self.metrics, pool_connections=1, pool_maxsize=1)
+            else:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            # Spread the agents over the sessions round robin
+            session.headers['User-Agent'] = self.user_agents[len(self.sessions) % len(self.user_agents)]
+            self.sessions.append(session)
+            return session
+
+    def checkin(self, session):
+        with self.lock:
+            self.idle.append(session)
+
+    def retry_delay(self, attempt, response=None):
+        # Honour Retry-After when Google sends one, otherwise back off exponentially
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        ceiling = min(self.max_backoff, self.backoff * 2 ** attempt)
+        # Full jitter can pick ~0 s, which is fine for a flaky connection but not for a host
+        # that just said it gets too many requests
+        floor = min(self.backoff, ceiling) if response is not None and response.status_code == 429 else 0
+        return random.uniform(floor, ceiling)
+
+    def get(self, url, throttle=None, **kwargs):
+        # throttle() is called before every retry, like the scheduler calls it before the first
+        # attempt, so retries count against the per-host rate and the budget; once it returns
+        # False (the run was stopped) the last response is returned or the last error raised
+        import requests
+
+        session = self.checkout()
+        try:
+            attempt = 0
+            while True:
+                egress = self.egress.acquire() if self.egress is not None else None
+                if egress is not None:
+                    kwargs['proxies'] = egress.proxies()
+                start = time.perf_counter()
+                try:
+                    response = session.get(url, **kwargs)
+                except requests.RequestException as e:
+                    if egress is None and not isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                        raise
+                    if self.metrics is not None:
+                        self.metrics.count('request_errors')
+                    if egress is not None:
+                        # A dead proxy is benched like a blocked one, try the next
+                        self.egress.release(egress, error=True)
+                    if attempt >= self.max_retries:
+                        raise
+                    with self.lock:
+                        self.retries += 1
+                    if egress is None:
+                        # A dropped connection or a timeout is retried like a 5xx
+                        time.sleep(self.retry_delay(attempt))
+                    if throttle is not None and not throttle():
+                        raise
+                    attempt += 1
+                    continue
+                with self.lock:
+                    self.requests += 1
+                if self.metrics is not None:
+                    self.record(response, time.perf_counter() - start)
+                if egress is not None:
+                    self.egress.release(egress, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code != 429 and response.status_code < 500:
+                    return response
+                if attempt >= self.max_retries:
+                    return response
+                with self.lock:
+                    self.retries += 1
+                if egress is None:
+                    # The egress pool paces retries through its cooldowns instead
+                    time.sleep(self.retry_delay(attempt, response))
+                if throttle is not None and not throttle():
+                    return response
+                attempt += 1
+        finally:
+            self.checkin(session)
+
+    def record(self, response, seconds):
+        # requests stops its clock once the headers are in, the rest is reading the body
+        waited = response.elapsed.total_seconds()
+        self.metrics.observe('response', waited)
+        self.metrics.observe('download', max(0.0, seconds - waited))
+        self.metrics.count('requests')
+        self.metrics.count('bytes_downloaded', len(response.content))
+        if response.status_code == 429:
+            self.metrics.count('responses_429')
+        elif response.status_code >= 500:
+            self.metrics.count('responses_5xx')
+
+    def stats(self):
+        # urllib3 counts the connections it opened and the requests it sent per pool,
+        # every request beyond a new connection went over a reused one
+        opened = 0
+        sent = 0
+        with self.lock:
+            sessions = list(self.sessions)
+            requests_made = self.requests
+            retries = self.retries
+        for session in sessions:
+            # The same adapter is mounted for http and https, count it once
+            for adapter in {id(a): a for a in session.adapters.values()}.values():
+                # Direct connections, plus one manager per proxy used
+                for manager in [adapter.poolmanager] + list(adapter.proxy_manager.values()):
+                    pools = manager.pools
+                    for key in list(pools.keys()):
+                        pool = pools.get(key)
+                        if pool is not None:
+                            opened += pool.num_connections
+                            sent += pool.num_requests
+        return {
+            'requests': requests_made,
+            'retries': retries,
+            'connections_opened': opened,
+            'connections_reused': max(0, sent - opened),
+        }
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions = []
+            self.idle = []
+
+
+class PageStats:
+    # Counts keywords, the result pages used for them and the pages requested, which also
+    # includes speculative fetches whose pages turned out not to be needed
+    def __init__(self):
+        self.keywords = 0
+        self.pages = 0
+        self.requested = 0
+        self.lock = threading.Lock()
+
+    def record(self, pages, requested=None):
+        with self.lock:
+            self.keywords += 1
+            self.pages += pages
+            self.requested += pages if requested is None else requested
+
+    def stats(self):
+        with self.lock:
+            return {
+                'keywords': self.keywords,
+                'pages': self.pages,
+                'pages_requested': self.requested,
+                'pages_wasted': self.requested - self.pages,
+                'pages_per_keyword': self.pages / self.keywords if self.keywords else 0.0,
+                'requests_per_keyword': self.requested / self.keywords if self.keywords else 0.0,
+            }
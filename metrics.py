@@ -0,0 +1,198 @@
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# Stages of a keyword check, in the order they happen
+STAGES = ['connect', 'response', 'download', 'parse', 'match', 'query', 'excel']
+
+
+class Histogram:
+    # Per-bucket (not cumulative) counts plus the count, sum and max of the observations
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Interpolated within the bucket the quantile falls in, like Prometheus does
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= target:
+                return min(self.max, lower + (bound - lower) * (target - seen) / count)
+            seen += count
+            lower = bound
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ['+Inf'], self.counts)},
+        }
+
+
+class Metrics:
+    # Counters and per-stage latency histograms for one run. Everything that does work
+    # records into the same instance from any thread; report() is the JSON run report and
+    # prometheus() the same numbers in the Prometheus text format.
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.stages = {}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.buckets)
+            self.stages[stage].observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def report(self):
+        with self.lock:
+            elapsed = time.time() - self.started
+            counters = dict(self.counters)
+            stages = {stage: histogram.summary() for stage, histogram in self.stages.items()}
+        requests_sent = counters.get('requests', 0)
+        # Known stages in run order, anything else a caller timed after them
+        ordered = [stage for stage in STAGES if stage in stages] + sorted(set(stages) - set(STAGES))
+        return {
+            'started': self.started,
+            'elapsed': elapsed,
+            'counters': counters,
+            'throughput': {
+                'queries_per_second': counters.get('queries', 0) / elapsed if elapsed else 0.0,
+                'requests_per_second': requests_sent / elapsed if elapsed else 0.0,
+                'bytes_per_second': counters.get('bytes_downloaded', 0) / elapsed if elapsed else 0.0,
+            },
+            'rate_limited_share': counters.get('responses_429', 0) / requests_sent if requests_sent else 0.0,
+            'stages': {stage: stages[stage] for stage in ordered},
+        }
+
+    def prometheus(self, prefix='rank'):
+        with self.lock:
+            counters = dict(self.counters)
+            stages = {stage: (list(h.counts), h.count, h.sum) for stage, h in self.stages.items()}
+        lines = []
+        for name in sorted(counters):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {counters[name]}')
+        if stages:
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+        for stage in sorted(stages):
+            counts, count, total = stages[stage]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        # Serve prometheus() at /metrics from a daemon thread; call shutdown() on the result to stop
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+@contextlib.contextmanager
+def profiled(path, top=40):
+    # Run the block under cProfile, save the raw stats to `path` (for pstats or snakeviz)
+    # and the `top` slowest calls by cumulative time to the same name with .txt. Before
+    # Python 3.12 a profiler only sees its own thread, so every thread started inside the
+    # block gets its own profiler and they are merged at the end.
+    import cProfile
+    import pstats
+
+    profilers = [cProfile.Profile()]
+    lock = threading.Lock()
+
+    def profile_thread(frame, event, arg):
+        profiler = cProfile.Profile()
+        with lock:
+            profilers.append(profiler)
+        sys.setprofile(None)
+        profiler.enable()
+
+    per_thread = sys.version_info < (3, 12)
+    if per_thread:
+        threading.setprofile(profile_thread)
+    profilers[0].enable()
+    try:
+        yield
+    finally:
+        profilers[0].disable()
+        if per_thread:
+            threading.setprofile(None)
+        with lock:
+            stats = pstats.Stats(*profilers)
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        stats.dump_stats(path)
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(top)
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
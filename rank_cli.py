@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rank
+from fetcher import TokenBucket
+from metrics import profiled
+from egress import load_proxies
+from rank_history import HISTORY_FILE, RankHistory
+from run_journal import RunJournal
+
+# Exit codes; 2 is what argparse exits with on a bad command line
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_PARTIAL = 3
+
+
+def locale_arg(value):
+    # A market as 'gl:hl', e.g. 'hk:zh-HK'
+    gl, _, hl = value.partition(':')
+    if not gl.strip() or not hl.strip():
+        raise argparse.ArgumentTypeError(f"invalid locale '{value}', expected 'gl:hl', e.g. hk:zh-HK or us:en")
+    return f'{gl.strip()}:{hl.strip()}'
+
+
+def rate_limit_policy(policy, wait_seconds, max_waits):
+    # Non-interactive replacement for the "Change VPN?" prompt
+    waits = {'count': 0}
+
+    def on_rate_limit(keywords):
+        if policy == 'wait' and waits['count'] < max_waits:
+            waits['count'] += 1
+            print(f"Rate limited on {len(keywords)} keyword(s), waiting {wait_seconds}s ({waits['count']}/{max_waits})", file=sys.stderr)
+            time.sleep(wait_seconds)
+            return 'retry'
+        if policy == 'skip':
+            return 'skip'
+        return 'stop'
+
+    return on_rate_limit
+
+
+def run_one(company, args, budget, history):
+    try:
+        keywords, site_names = rank.load_company(company)
+        journal = RunJournal(os.path.join(args.output, f'{company}_journal.jsonl'))
+        summary = rank.run_company(
+            company, keywords, site_names,
+            on_error=lambda query, error_message: print(f'{company}: {error_message}', file=sys.stderr),
+            on_rate_limit=rate_limit_policy(args.on_rate_limit, args.wait_seconds, args.max_waits),
+            offline=args.offline,
+            resume=args.resume and journal.resumable(),
+            budget=budget,
+            output_folder=args.output,
+            search_url=args.search_url,
+            concurrency=args.concurrency,
+            locales=args.locale,
+            devices=args.device,
+            history=history,
+        )
+        summary['status'] = 'partial' if summary['failed'] or summary['pending'] else 'ok'
+    except Exception as e:
+        summary = {'company': company, 'status': 'error', 'error': str(e)}
+    return summary
+
+
+def run_shared(companies, args, budget, history):
+    # Check the companies as one batch so keywords they share are only fetched once
+    loaded = {}
+    summaries = []
+    for company in companies:
+        try:
+            loaded[company] = rank.load_company(company)
+        except Exception as e:
+            summaries.append({'company': company, 'status': 'error', 'error': str(e)})
+    if not loaded:
+        return summaries, None
+    try:
+        batch = rank.run_batch(
+            loaded,
+            on_error=lambda company, query, error_message: print(f'{company}: {error_message}', file=sys.stderr),
+            on_rate_limit=rate_limit_policy(args.on_rate_limit, args.wait_seconds, args.max_waits),
+            offline=args.offline,
+            resume=args.resume,
+            budget=budget,
+            output_folder=args.output,
+            search_url=args.search_url,
+            concurrency=args.concurrency,
+            locales=args.locale,
+            devices=args.device,
+            history=history,
+        )
+    except Exception as e:
+        return summaries + [{'company': company, 'status': 'error', 'error': str(e)} for company in loaded], None
+    for summary in batch['companies']:
+        summary['status'] = 'partial' if summary['failed'] or summary['pending'] else 'ok'
+    fetches = {key: batch[key] for key in ('requested', 'unique_queries', 'queries_shared', 'fetched')}
+    return summaries + batch['companies'], fetches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check Google rankings without the GUI, e.g. from cron')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--company', action='append', help='company to check, can be given more than once')
+    target.add_argument('--all', action='store_true', help='check every company in keywords/')
+    parser.add_argument('--on-rate-limit', choices=['stop', 'skip', 'wait'], default='stop',
+                        help='stop the company (resumable later), skip the rate limited keywords, or wait and retry')
+    parser.add_argument('--wait-seconds', type=float, default=300, help='how long the wait policy sleeps')
+    parser.add_argument('--max-waits', type=int, default=3, help='how many times the wait policy retries per company')
+    parser.add_argument('--parallel', type=int, default=2, help='companies checked at the same time')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='check the companies as one batch, fetching keywords they share only once (ignores --parallel)')
+    parser.add_argument('--concurrency', type=int, default=rank.FETCH_CONCURRENCY, help='keywords fetched at the same time per company')
+    parser.add_argument('--budget', type=float, default=rank.FETCH_RATE_PER_HOST, help='requests per second across all companies')
+    parser.add_argument('--offline', action='store_true', help='re-rank from cached result pages only')
+    parser.add_argument('--paginated', action='store_true', help='walk result pages with start= instead of one num=100 page')
+    parser.add_argument('--locale', action='append', type=locale_arg, help="market as 'gl:hl', e.g. hk:zh-HK or us:en; can be given more than once")
+    parser.add_argument('--device', action='append', choices=['desktop', 'mobile'], help='device to check as, can be given more than once')
+    parser.add_argument('--max-depth', type=int, default=rank.SERP_MAX_DEPTH, help='deepest result checked in paginated mode')
+    parser.add_argument('--proxy', action='append', help="proxy URL to spread requests over ('direct' for none), can be given more than once")
+    parser.add_argument('--proxy-file', help='file with one proxy URL per line (default: rank.EGRESS_PROXY_FILE if present)')
+    parser.add_argument('--resume', action='store_true', help="resume today's unfinished runs")
+    parser.add_argument('--output', default='results', help='folder for the rankings workbooks')
+    parser.add_argument('--history', help=f'rank history database (default: {os.path.basename(HISTORY_FILE)} in --output)')
+    parser.add_argument('--search-url', default=rank.GOOGLE_SEARCH_URL, help='search endpoint, e.g. a local stub server')
+    parser.add_argument('--json', action='store_true', help='print a JSON summary instead of text')
+    parser.add_argument('--combined', help='also write one report (.xlsx, or .csv files) with a sheet per company and summary sheets')
+    parser.add_argument('--report', help='where to write the JSON run report (default: run_report.json in --output)')
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this port at /metrics during the run')
+    parser.add_argument('--profile', action='store_true', help='run under cProfile, saving run_profile.prof/.txt in --output')
+    args = parser.parse_args(argv)
+
+    companies = rank.get_company_names() if args.all else args.company
+    rank.SERP_PAGINATED = args.paginated
+    rank.SERP_MAX_DEPTH = args.max_depth
+    if args.proxy or args.proxy_file:
+        rank.use_proxies((args.proxy or []) + (load_proxies(args.proxy_file) if args.proxy_file else []))
+
+    # Trends and day-over-day changes are kept next to the results unless told otherwise
+    history = RankHistory(args.history or os.path.join(args.output, os.path.basename(HISTORY_FILE)))
+
+    # One bucket shared by every company keeps the total request rate under the budget
+    budget = TokenBucket(args.budget, max(1, args.concurrency)) if args.budget else None
+
+    rank.run_metrics.reset()
+    metrics_server = rank.run_metrics.serve(args.metrics_port) if args.metrics_port else None
+    profile = profiled(os.path.join(args.output, 'run_profile.prof')) if args.profile else contextlib.nullcontext()
+
+    # Keep stdout for the JSON summary, the per-keyword progress goes to stderr
+    progress = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    fetches = None
+    with progress, profile:
+        if args.dedupe:
+            summaries, fetches = run_shared(companies, args, budget, history)
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as executor:
+                summaries = list(executor.map(lambda company: run_one(company, args, budget, history), companies))
+
+    if args.combined:
+        with rank.run_metrics.timer('excel'):
+            rank.write_report(args.combined, [summary['company'] for summary in summaries if summary['status'] != 'error'], args.output, history,
+                              args.locale, args.device)
+
+    if any(summary['status'] == 'error' for summary in summaries):
+        exit_code = EXIT_ERROR
+    elif any(summary['status'] == 'partial' for summary in summaries):
+        exit_code = EXIT_PARTIAL
+    else:
+        exit_code = EXIT_OK
+
+    report = {
+        'exit_code': exit_code,
+        'companies': summaries,
+        'http': {device: sessions.stats() for device, sessions in rank.device_sessions.items()},
+        'serp': rank.serp_stats.stats(),
+        'metrics': rank.run_metrics.report(),
+        # Seconds each company's keywords and sites took to read from the sidecar or workbooks
+        'config_load_seconds': dict(rank.config_store.load_times),
+    }
+    if fetches is not None:
+        report['fetches'] = fetches
+    if rank.egress_pool is not None:
+        report['egress'] = rank.egress_pool.stats()
+    report_file = args.report or os.path.join(args.output, 'run_report.json')
+    if os.path.dirname(report_file) and not os.path.exists(os.path.dirname(report_file)):
+        os.makedirs(os.path.dirname(report_file))
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    history.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        for summary in summaries:
+            if summary['status'] == 'error':
+                print(f"{summary['company']}: error: {summary['error']}")
+            else:
+                print(f"{summary['company']}: {summary['status']}, {summary['completed']}/{summary['keywords']} keywords -> {summary['output_file']}")
+        if fetches is not None:
+            print(f"{fetches['unique_queries']} unique queries for {fetches['requested']} company keywords "
+                  f"({fetches['queries_shared']} shared), {fetches['fetched']} fetches made")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from run_journal import DEFAULT_LOCALE, DEFAULT_DEVICE
+
+HISTORY_FILE = os.path.join('results', 'rank_history.sqlite3')
+
+# Rank and page as stored, NULL when the keyword wasn't found; older runs stored rank and page 100
+FOUND_RANK = 'CASE WHEN rank = 100 AND page = 100 THEN NULL ELSE rank END'
+FOUND_PAGE = 'CASE WHEN rank = 100 AND page = 100 THEN NULL ELSE page END'
+
+
+def iso_date(date):
+    # rank_check writes dates as dd-mm-YYYY, the store keeps ISO dates so they sort
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        return date.strftime('%Y-%m-%d')
+    try:
+        return datetime.datetime.strptime(date, '%d-%m-%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return date
+
+
+class RankHistory:
+    # Append-only store of every rank/page row a run produces. Several runs on the same
+    # day are all kept; queries use the last one recorded for each day. Every query is
+    # for one locale and device, the defaults being the original Hong Kong desktop check.
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS ranks ('
+                'id INTEGER PRIMARY KEY, company TEXT, keyword TEXT, date TEXT, rank INTEGER, page INTEGER, recorded REAL, '
+                f"locale TEXT DEFAULT '{DEFAULT_LOCALE}', device TEXT DEFAULT '{DEFAULT_DEVICE}')"
+            )
+            # Stores created before locales and devices were tracked lack those columns
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(ranks)')]
+            if 'locale' not in columns:
+                self.conn.execute(f"ALTER TABLE ranks ADD COLUMN locale TEXT DEFAULT '{DEFAULT_LOCALE}'")
+                self.conn.execute(f"ALTER TABLE ranks ADD COLUMN device TEXT DEFAULT '{DEFAULT_DEVICE}'")
+                self.conn.execute('DROP INDEX IF EXISTS ranks_keyword_date')
+                self.conn.execute('DROP INDEX IF EXISTS ranks_date')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS ranks_series ON ranks (company, locale, device, keyword, date)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS ranks_daily ON ranks (company, locale, device, date, keyword)')
+            self.conn.commit()
+        return self.conn
+
+    def record(self, company, row):
+        # row is a result row with Keyword, Date, Rank and Page, and optionally Locale and Device
+        self.record_many(company, [row])
+
+    def record_many(self, company, rows):
+        values = [
+            (company, str(row['Keyword']), iso_date(row['Date']),
+             int(row['Rank']) if row['Rank'] is not None else None, int(row['Page']) if row['Page'] is not None else None,
+             time.time(), row.get('Locale', DEFAULT_LOCALE), row.get('Device', DEFAULT_DEVICE))
+            for row in rows
+        ]
+        with self.lock:
+            conn = self.connect()
+            conn.executemany(
+                'INSERT INTO ranks (company, keyword, date, rank, page, recorded, locale, device) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                values,
+            )
+            conn.commit()
+
+    def _query(self, sql, params):
+        with self.lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    def _daily(self, company, date, locale, device):
+        # Last recorded rank of every keyword on one day, None when it wasn't found
+        rows = self._query(
+            f'SELECT keyword, {FOUND_RANK} FROM ranks WHERE id IN ('
+            'SELECT MAX(id) FROM ranks WHERE company = ? AND locale = ? AND device = ? AND date = ? GROUP BY keyword)',
+            (company, locale, device, date),
+        )
+        return dict(rows)
+
+    def dates(self, company, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        return [row[0] for row in self._query(
+            'SELECT DISTINCT date FROM ranks WHERE company = ? AND locale = ? AND device = ? ORDER BY date',
+            (company, locale, device),
+        )]
+
+    def last_date(self, company, before=None, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        # Latest run day, optionally the latest one on or before `before`; a single index lookup
+        if before is None:
+            rows = self._query('SELECT MAX(date) FROM ranks WHERE company = ? AND locale = ? AND device = ?', (company, locale, device))
+        else:
+            rows = self._query(
+                'SELECT MAX(date) FROM ranks WHERE company = ? AND locale = ? AND device = ? AND date <= ?',
+                (company, locale, device, before),
+            )
+        return rows[0][0]
+
+    def series(self, company, keyword, days=30, end=None, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        # [(date, rank, page)] for the last `days` days up to `end` (today by default)
+        end = iso_date(end or datetime.date.today())
+        start = (datetime.date.fromisoformat(end) - datetime.timedelta(days=days - 1)).isoformat()
+        return self._query(
+            f'SELECT date, {FOUND_RANK}, {FOUND_PAGE} FROM ranks WHERE id IN ('
+            'SELECT MAX(id) FROM ranks WHERE company = ? AND locale = ? AND device = ? AND keyword = ? '
+            'AND date BETWEEN ? AND ? GROUP BY date) ORDER BY date',
+            (company, locale, device, keyword, start, end),
+        )
+
+    def previous_ranks(self, company, date, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        # {keyword: rank} of the last run day before `date`
+        day_before = (datetime.date.fromisoformat(iso_date(date)) - datetime.timedelta(days=1)).isoformat()
+        previous = self.last_date(company, day_before, locale, device)
+        return self._daily(company, previous, locale, device) if previous else {}
+
+    def deltas(self, company, date=None, previous=None, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        # Rank change of every keyword between two run days (by default the last two)
+        date = iso_date(date) if date else self.last_date(company, locale=locale, device=device)
+        if previous:
+            previous = iso_date(previous)
+        elif date is not None:
+            day_before = (datetime.date.fromisoformat(date) - datetime.timedelta(days=1)).isoformat()
+            previous = self.last_date(company, day_before, locale, device)
+        if date is None or previous is None:
+            return []
+        new = self._daily(company, date, locale, device)
+        old = self._daily(company, previous, locale, device)
+        # A positive change means the keyword moved up (a smaller rank number); there is none
+        # when either day didn't find it
+        return [
+            {'keyword': keyword, 'previous': old.get(keyword), 'rank': rank,
+             'change': old[keyword] - rank if old.get(keyword) is not None and rank is not None else None}
+            for keyword, rank in sorted(new.items())
+        ]
+
+    def movers(self, company, days=7, limit=10, locale=DEFAULT_LOCALE, device=DEFAULT_DEVICE):
+        # Biggest climbers and fallers between the latest run and the latest run `days` ago
+        latest = self.last_date(company, locale=locale, device=device)
+        if latest is None:
+            return {'up': [], 'down': []}
+        cutoff = (datetime.date.fromisoformat(latest) - datetime.timedelta(days=days)).isoformat()
+        earlier = self.last_date(company, cutoff, locale, device)
+        if earlier is None:
+            return {'up': [], 'down': []}
+        changes = [d for d in self.deltas(company, latest, earlier, locale, device) if d['change']]
+        changes.sort(key=lambda d: d['change'])
+        return {
+            'up': [d for d in reversed(changes) if d['change'] > 0][:limit],
+            'down': [d for d in changes if d['change'] < 0][:limit],
+        }
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the rank history')
+    parser.add_argument('query', choices=['series', 'deltas', 'movers'])
+    parser.add_argument('company')
+    parser.add_argument('--keyword', help='keyword for the series query')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--locale', default=DEFAULT_LOCALE, help="market as 'gl:hl'")
+    parser.add_argument('--device', default=DEFAULT_DEVICE, choices=['desktop', 'mobile'])
+    parser.add_argument('--history', default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    history = RankHistory(args.history)
+    if args.query == 'series':
+        if not args.keyword:
+            parser.error('series needs --keyword')
+        result = history.series(args.company, args.keyword, args.days, locale=args.locale, device=args.device)
+    elif args.query == 'deltas':
+        result = history.deltas(args.company, locale=args.locale, device=args.device)
+    else:
+        result = history.movers(args.company, args.days, args.limit, args.locale, args.device)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,160 @@
+import csv
+import heapq
+import os
+import re
+from run_journal import COLUMNS, is_found
+
+# Columns of a company sheet: the result row plus its day-over-day change
+REPORT_COLUMNS = COLUMNS + ['Previous', 'Change']
+
+# (label, lowest rank, highest rank or None for no limit); keywords without a rank go to NOT_FOUND
+RANK_BUCKETS = [('Top 3', 1, 3), ('4-10', 4, 10), ('11-20', 11, 20), ('21-50', 21, 50), ('51-100', 51, 100), ('101+', 101, None)]
+NOT_FOUND = 'Not found'
+
+SUMMARY_COLUMNS = ['Company', 'Locale', 'Device', 'Keywords', 'Found', 'Top 3', 'Top 10', 'Average rank',
+                   'Improved', 'Declined', 'Unchanged', 'New']
+BUCKET_COLUMNS = ['Company', 'Locale', 'Device'] + [label for label, _, _ in RANK_BUCKETS] + [NOT_FOUND]
+CHANGE_COLUMNS = ['Company', 'Keyword', 'Locale', 'Device', 'Previous', 'Rank', 'Change']
+
+# Excel sheet names: at most 31 characters and none of these
+INVALID_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+
+
+class Tally:
+    # Running counts for one company, locale and device
+    def __init__(self):
+        self.keywords = 0
+        self.found = 0
+        self.rank_total = 0
+        self.buckets = dict.fromkeys([label for label, _, _ in RANK_BUCKETS] + [NOT_FOUND], 0)
+        self.changes = {'Improved': 0, 'Declined': 0, 'Unchanged': 0, 'New': 0}
+
+    def add(self, row, movement):
+        self.keywords += 1
+        if is_found(row):
+            self.found += 1
+            self.rank_total += row['Rank']
+            for label, low, high in RANK_BUCKETS:
+                if low <= row['Rank'] and (high is None or row['Rank'] <= high):
+                    self.buckets[label] += 1
+                    break
+        else:
+            self.buckets[NOT_FOUND] += 1
+        self.changes[movement] += 1
+
+
+def movement(seen, old, rank, change):
+    # How a keyword moved since the previous run day; old and rank are None when not found
+    if not seen:
+        return 'New'
+    if change is not None:
+        return 'Improved' if change > 0 else 'Declined' if change < 0 else 'Unchanged'
+    if old is None and rank is None:
+        return 'Unchanged'
+    # Dropped out of the depth checked, or came into it
+    return 'Declined' if rank is None else 'Improved'
+
+
+class ReportWriter:
+    # Writes rankings as they are read, one company at a time, so memory is bounded by the
+    # largest company rather than the whole run. Every company gets its own sheet (with the
+    # change since the previous run day when the history is available); closing adds a
+    # Summary sheet (found, top 3/top 10, average rank, changes), a Rank buckets sheet and a
+    # Changes sheet with each company's biggest climbers and fallers.
+    # A path ending in .csv writes <name>_<sheet>.csv files instead of a workbook.
+    def __init__(self, path, movers=20):
+        self.path = path
+        self.movers = movers
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.csv = path.lower().endswith('.csv')
+        self.workbook = None
+        if not self.csv:
+            from openpyxl import Workbook
+
+            self.workbook = Workbook(write_only=True)
+        self.files = []
+        self.sheet_names = set()
+        self.tallies = {}
+        self.changes = []
+
+    def _sheet(self, name, columns):
+        # A new sheet (or CSV file) with a unique, valid name; returns its append function
+        name = INVALID_SHEET_CHARACTERS.sub('_', str(name))[:31] or 'Sheet'
+        base, count = name, 1
+        while name.lower() in self.sheet_names:
+            count += 1
+            suffix = f' ({count})'
+            name = base[:31 - len(suffix)] + suffix
+        self.sheet_names.add(name.lower())
+        if self.csv:
+            f = open(f'{os.path.splitext(self.path)[0]}_{name}.csv', 'w', encoding='utf-8-sig', newline='')
+            self.files.append(f)
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            return writer.writerow
+        sheet = self.workbook.create_sheet(name)
+        sheet.append(columns)
+        return sheet.append
+
+    def add_company(self, company, rows, previous=None, sheet_name=None):
+        # rows: the company's result rows, e.g. RunJournal.unique_rows(); previous(locale, device)
+        # returns {keyword: rank} of the previous run day, rank None when it wasn't found.
+        # Returns the number of rows written.
+        append = self._sheet(sheet_name or company, REPORT_COLUMNS)
+        previous_ranks = {}
+        climbers = []
+        fallers = []
+        count = 0
+        for row in rows:
+            dimension = (row['Locale'], row['Device'])
+            if previous is not None and dimension not in previous_ranks:
+                previous_ranks[dimension] = previous(*dimension)
+            ranks = previous_ranks.get(dimension, {})
+            seen = str(row['Keyword']) in ranks
+            old = ranks.get(str(row['Keyword']))
+            rank = row['Rank'] if is_found(row) else None
+            # A positive change means the keyword moved up (a smaller rank number); there is
+            # none when either day didn't find it
+            change = old - rank if old is not None and rank is not None else None
+            append([row[column] for column in COLUMNS] + [old, change])
+            count += 1
+
+            key = (company,) + dimension
+            if key not in self.tallies:
+                self.tallies[key] = Tally()
+            self.tallies[key].add(row, movement(seen, old, rank, change))
+            if change:
+                # Keep only the biggest movers each way
+                mover = (abs(change), count, [company, row['Keyword'], row['Locale'], row['Device'], old, row['Rank'], change])
+                heap = climbers if change > 0 else fallers
+                if len(heap) < self.movers:
+                    heapq.heappush(heap, mover)
+                else:
+                    heapq.heappushpop(heap, mover)
+        for heap in (climbers, fallers):
+            self.changes.extend(entry for _, _, entry in sorted(heap, reverse=True))
+        return count
+
+    def close(self):
+        # Write the summary sheets and save
+        append = self._sheet('Summary', SUMMARY_COLUMNS)
+        for (company, locale, device), tally in self.tallies.items():
+            append([
+                company, locale, device, tally.keywords, tally.found,
+                tally.buckets['Top 3'], tally.buckets['Top 3'] + tally.buckets['4-10'],
+                round(tally.rank_total / tally.found, 1) if tally.found else None,
+            ] + list(tally.changes.values()))
+        append = self._sheet('Rank buckets', BUCKET_COLUMNS)
+        for (company, locale, device), tally in self.tallies.items():
+            append([company, locale, device] + list(tally.buckets.values()))
+        append = self._sheet('Changes', CHANGE_COLUMNS)
+        for entry in self.changes:
+            append(entry)
+
+        if self.csv:
+            for f in self.files:
+                f.close()
+        else:
+            self.workbook.save(self.path)
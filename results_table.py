@@ -0,0 +1,80 @@
+import tkinter as tk
+import tkinter.ttk as ttk
+
+
+class VirtualTable(ttk.Frame):
+    # A results table that only creates Treeview rows for the lines on screen and fills
+    # them from a plain list as it scrolls, so it stays fast with tens of thousands of rows.
+    # While scrolled to the bottom it follows new rows as they are added.
+    def __init__(self, master, columns, widths=None, row_height=20, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.rows = []
+        self.offset = 0
+        self.visible = 0
+        self.row_height = row_height
+        self.follow = True
+
+        # Pin the row height so the number of rows on screen can be worked out from the widget size
+        ttk.Style(self).configure('Results.Treeview', rowheight=row_height)
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='none', height=1, style='Results.Treeview')
+        for i, column in enumerate(columns):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=(widths or {}).get(column, 80), stretch=i == 0)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll(-1 if event.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(1, 'units'))
+
+    def on_resize(self, event):
+        # Keep as many Treeview items as fit; the heading is a little taller than a row
+        # in most themes, so leave room for two
+        visible = max(1, event.height // self.row_height - 2)
+        if visible != self.visible:
+            self.visible = visible
+            self.tree.delete(*self.tree.get_children())
+            for _ in range(visible):
+                self.tree.insert('', tk.END, values=())
+            self.render()
+
+    def max_offset(self):
+        return max(0, len(self.rows) - self.visible)
+
+    def render(self):
+        if self.follow:
+            self.offset = self.max_offset()
+        for i, item in enumerate(self.tree.get_children()):
+            index = self.offset + i
+            self.tree.item(item, values=self.rows[index] if index < len(self.rows) else ())
+        total = max(1, len(self.rows))
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible) / total))
+
+    def scroll_to(self, offset):
+        self.offset = min(max(0, int(offset)), self.max_offset())
+        self.follow = self.offset >= self.max_offset()
+        self.render()
+
+    def scroll(self, amount, what):
+        step = self.visible if what == 'pages' else 1
+        self.scroll_to(self.offset + amount * step)
+
+    def on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            self.scroll(int(args[1]), args[2])
+
+    def extend(self, rows):
+        # Add a batch of rows and redraw once
+        self.rows.extend(rows)
+        self.render()
+
+    def clear(self):
+        self.rows = []
+        self.offset = 0
+        self.follow = True
+        self.render()
@@ -0,0 +1,134 @@
+import datetime
+import json
+import os
+import threading
+
+# Columns of every result row, in the order they are written to Excel
+COLUMNS = ['Keyword', 'Locale', 'Device', 'Date', 'Rank', 'Page']
+
+# Market and device of rows written before runs had more than one
+DEFAULT_LOCALE = 'hk:zh-HK'
+DEFAULT_DEVICE = 'desktop'
+
+
+def is_found(row):
+    # A keyword not found within the depth checked has no rank; rows written before deeper
+    # checks existed marked it with rank and page 100 instead (a found rank 100 is on page 10)
+    return row['Rank'] is not None and not (row['Rank'] == 100 and row['Page'] == 100)
+
+
+def row_key(row):
+    # A result is unique per keyword, locale and device
+    return (row['Keyword'], row.get('Locale', DEFAULT_LOCALE), row.get('Device', DEFAULT_DEVICE))
+
+
+class RunJournal:
+    # Append-only JSONL log of one company's run. The first line describes the run,
+    # every keyword's result is appended and flushed the moment it arrives, and a
+    # final line marks the run as finished. An unfinished journal from today can be
+    # resumed, skipping the keywords it already has.
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.done = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def today():
+        return datetime.date.today().isoformat()
+
+    def read(self):
+        # Yield every line of the journal, ignoring a half-written last line after a crash
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def resumable(self):
+        # True if there is an unfinished run from today to pick up
+        header = None
+        finished = False
+        for entry in self.read():
+            if 'run' in entry:
+                header = entry['run']
+            elif entry.get('finished'):
+                finished = True
+        return header is not None and header.get('date') == self.today() and not finished
+
+    def rows(self):
+        for entry in self.read():
+            if 'row' in entry:
+                row = entry['row']
+                row.setdefault('Locale', DEFAULT_LOCALE)
+                row.setdefault('Device', DEFAULT_DEVICE)
+                yield row
+
+    def start(self, company, resume=False):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        if resume and self.resumable():
+            self.done = {row_key(row) for row in self.rows()}
+            self.drop_partial_line()
+            self.file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self.done = set()
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self._write({'run': {'company': company, 'date': self.today()}})
+
+    def drop_partial_line(self):
+        # A crash mid-write leaves a line without its newline, cut it off before appending
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _write(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+    def append(self, row):
+        # row is a dict with the COLUMNS keys
+        row = {column: row[column] for column in COLUMNS}
+        self._write({'row': row})
+        self.done.add(row_key(row))
+
+    def finish(self):
+        self._write({'finished': True})
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def unique_rows(self, order=None):
+        # One row per query. Without `order` the rows are streamed as they were journaled,
+        # first result per query wins. With `order` (row keys, e.g. of the keywords sheet)
+        # the last result per query is kept and the rows come out in that order, followed
+        # by any query the order doesn't list; memory grows with the number of queries.
+        if order is None:
+            seen = set()
+            for row in self.rows():
+                if row_key(row) not in seen:
+                    seen.add(row_key(row))
+                    yield row
+            return
+
+        latest = {}
+        for row in self.rows():
+            key = row_key(row)
+            # Re-inserting moves a repeated query to the end, like the journal order
+            latest.pop(key, None)
+            latest[key] = row
+        for key in order:
+            row = latest.pop(key, None)
+            if row is not None:
+                yield row
+        yield from latest.values()
@@ -0,0 +1,112 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class SerpCache:
+    # Local cache of raw Google result pages in SQLite, zlib compressed.
+    # Entries are keyed by a hash of (keyword, gl, hl, num, date) plus the `start`
+    # offset for pages after the first and the device when it isn't desktop, expire after `ttl`
+    # seconds, and the least recently used ones are evicted once the cache grows past
+    # `max_bytes` of compressed pages.
+    def __init__(self, path, ttl=24 * 3600, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.conn = None
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def connect(self):
+        # Open the database on first use so importing the app never touches disk
+        if self.conn is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS serp_cache ('
+                'key TEXT PRIMARY KEY, keyword TEXT, gl TEXT, hl TEXT, num INTEGER, date TEXT, '
+                'body BLOB, size INTEGER, created REAL, accessed REAL)'
+            )
+            # Caches created before paginated fetching have no start column
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(serp_cache)')]
+            if 'start' not in columns:
+                self.conn.execute('ALTER TABLE serp_cache ADD COLUMN start INTEGER DEFAULT 0')
+            if 'device' not in columns:
+                self.conn.execute("ALTER TABLE serp_cache ADD COLUMN device TEXT DEFAULT 'desktop'")
+            self.conn.execute('CREATE INDEX IF NOT EXISTS serp_cache_query ON serp_cache (keyword, gl, hl, num, date)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS serp_cache_accessed ON serp_cache (accessed)')
+            self.conn.commit()
+            self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM serp_cache').fetchone()[0]
+        return self.conn
+
+    @staticmethod
+    def key(keyword, gl, hl, num, date, start=0, device='desktop'):
+        # The first desktop page keeps the original key so existing entries stay valid
+        parts = [keyword, gl, hl, num, date] + ([start] if start else []) + ([device] if device != 'desktop' else [])
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def today():
+        return datetime.date.today().isoformat()
+
+    def get(self, keyword, gl, hl, num, date=None, start=0, device='desktop'):
+        # Return the cached page for this query and date, or None if missing or expired
+        key = self.key(keyword, gl, hl, num, date or self.today(), start, device)
+        with self.lock:
+            conn = self.connect()
+            row = conn.execute('SELECT body, created FROM serp_cache WHERE key = ?', (key,)).fetchone()
+            if row is None or time.time() - row[1] > self.ttl:
+                return None
+            conn.execute('UPDATE serp_cache SET accessed = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def latest(self, keyword, gl, hl, num, start=0, device='desktop'):
+        # Newest cached page for the query whatever its age, used for offline re-ranking
+        with self.lock:
+            row = self.connect().execute(
+                'SELECT body FROM serp_cache WHERE keyword = ? AND gl = ? AND hl = ? AND num = ? AND COALESCE(start, 0) = ? '
+                "AND COALESCE(device, 'desktop') = ? ORDER BY date DESC, created DESC LIMIT 1",
+                (keyword, gl, hl, num, start, device),
+            ).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def put(self, keyword, gl, hl, num, html, date=None, start=0, device='desktop'):
+        date = date or self.today()
+        body = zlib.compress(html.encode('utf-8'), 6)
+        key = self.key(keyword, gl, hl, num, date, start, device)
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            old = conn.execute('SELECT size FROM serp_cache WHERE key = ?', (key,)).fetchone()
+            conn.execute(
+                'INSERT OR REPLACE INTO serp_cache (key, keyword, gl, hl, num, date, body, size, created, accessed, start, device) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, keyword, gl, hl, num, date, body, len(body), now, now, start, device),
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.evict(conn)
+            conn.commit()
+
+    def evict(self, conn):
+        # Drop least recently used pages until the cache fits in max_bytes
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, size in conn.execute('SELECT key, size FROM serp_cache ORDER BY accessed').fetchall():
+            conn.execute('DELETE FROM serp_cache WHERE key = ?', (key,))
+            self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
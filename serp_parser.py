@@ -0,0 +1,196 @@
+import importlib.util
+from collections import namedtuple
+from html.parser import HTMLParser
+
+# One organic/ad result pulled out of a Google result page
+SerpResult = namedtuple('SerpResult', ['url', 'title', 'snippet', 'result_type'])
+
+# Classes Google puts on the result link block and on the snippet block
+RESULT_CLASS = 'yuRUbf'
+SNIPPET_CLASS = 'VwiC3b'
+
+# Containers that hold sponsored results at the top and bottom of the page
+AD_CONTAINER_IDS = {'tads', 'tadsb', 'bottomads'}
+
+
+def clean_url(url):
+    # Find the start of 'https://'
+    start = url.find('https://')
+    if start == -1:
+        return None  # 'https://' not found in the URL
+
+    # Find the end position, which is the start of '&ved'
+    end = url.find('&ved', start)
+    if end == -1:
+        # If '&ved' is not found, return the URL from 'https://' onwards
+        return url[start:]
+    else:
+        # Return the URL from 'https://' up to '&ved'
+        return url[start:end]
+
+
+def _build_results(events):
+    # Every backend emits ('result', href, title, is_ad) and ('snippet', text) events in
+    # document order; a snippet belongs to the result right before it
+    results = []
+    for event in events:
+        if event[0] == 'result':
+            _, href, title, is_ad = event
+            results.append([href, title, '', 'ad' if is_ad else 'organic'])
+        elif results and not results[-1][2]:
+            results[-1][2] = event[1]
+
+    parsed = []
+    for href, title, snippet, result_type in results:
+        url = clean_url(href or "No URL")
+        if url is not None:
+            parsed.append(SerpResult(url, ' '.join(title.split()), ' '.join(snippet.split()), result_type))
+    return parsed
+
+
+class _StreamingSerpParser(HTMLParser):
+    # Walks the page once with the standard library parser, tracking div depth to know
+    # when it is inside a result block, a snippet block or an ad container
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self.div_depth = 0
+        self.result_depth = None
+        self.snippet_depth = None
+        self.ad_depth = None
+        self.in_title = False
+        self.href = None
+        self.title = []
+        self.snippet = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'div':
+            self.div_depth += 1
+            attrs = dict(attrs)
+            classes = (attrs.get('class') or '').split()
+            if self.ad_depth is None and attrs.get('id') in AD_CONTAINER_IDS:
+                self.ad_depth = self.div_depth
+            if self.result_depth is None and RESULT_CLASS in classes:
+                self.result_depth = self.div_depth
+                self.href = None
+                self.title = []
+            elif self.snippet_depth is None and SNIPPET_CLASS in classes:
+                self.snippet_depth = self.div_depth
+                self.snippet = []
+        elif self.result_depth is not None:
+            if tag == 'a' and self.href is None:
+                self.href = dict(attrs).get('href') or "No URL"
+            elif tag == 'h3':
+                self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == 'div':
+            if self.result_depth == self.div_depth:
+                self.events.append(('result', self.href, ''.join(self.title), self.ad_depth is not None))
+                self.result_depth = None
+            if self.snippet_depth == self.div_depth:
+                self.events.append(('snippet', ''.join(self.snippet)))
+                self.snippet_depth = None
+            if self.ad_depth == self.div_depth:
+                self.ad_depth = None
+            self.div_depth -= 1
+        elif tag == 'h3':
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title.append(data)
+        if self.snippet_depth is not None:
+            self.snippet.append(data)
+
+
+def parse_htmlparser(html):
+    parser = _StreamingSerpParser()
+    parser.feed(html)
+    parser.close()
+    return _build_results(parser.events)
+
+
+def parse_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    events = []
+    # select() returns matches in document order, so snippets follow their result
+    for div in soup.select(f'div.{RESULT_CLASS}, div.{SNIPPET_CLASS}'):
+        if RESULT_CLASS in div.get('class', []):
+            anchor = div.find('a')
+            title = div.find('h3')
+            is_ad = div.find_parent(id=lambda value: value in AD_CONTAINER_IDS) is not None
+            events.append(('result', anchor.get('href', "No URL") if anchor else None, title.get_text() if title else '', is_ad))
+        else:
+            events.append(('snippet', div.get_text()))
+    return _build_results(events)
+
+
+def parse_lxml(html):
+    import lxml.etree
+    import lxml.html
+
+    if not html or not html.strip():
+        return []
+    try:
+        tree = lxml.html.fromstring(html)
+    except lxml.etree.ParserError:
+        # Nothing but comments or processing instructions, i.e. no results
+        return []
+    has_class = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+    events = []
+    for div in tree.xpath(f'//div[{has_class.format(RESULT_CLASS)}] | //div[{has_class.format(SNIPPET_CLASS)}]'):
+        if RESULT_CLASS in (div.get('class') or '').split():
+            anchors = div.xpath('.//a')
+            titles = div.xpath('.//h3')
+            is_ad = any(ancestor.get('id') in AD_CONTAINER_IDS for ancestor in div.iterancestors('div'))
+            events.append(('result', anchors[0].get('href', "No URL") if anchors else None, titles[0].text_content() if titles else '', is_ad))
+        else:
+            events.append(('snippet', div.text_content()))
+    return _build_results(events)
+
+
+def parse_selectolax(html):
+    from selectolax.parser import HTMLParser as SelectolaxParser
+
+    tree = SelectolaxParser(html)
+    events = []
+    for div in tree.css(f'div.{RESULT_CLASS}, div.{SNIPPET_CLASS}'):
+        if RESULT_CLASS in (div.attributes.get('class') or '').split():
+            anchor = div.css_first('a')
+            title = div.css_first('h3')
+            is_ad = False
+            parent = div.parent
+            while parent is not None:
+                if parent.attributes.get('id') in AD_CONTAINER_IDS:
+                    is_ad = True
+                    break
+                parent = parent.parent
+            events.append(('result', (anchor.attributes.get('href') or "No URL") if anchor else None, title.text() if title else '', is_ad))
+        else:
+            events.append(('snippet', div.text()))
+    return _build_results(events)
+
+
+# Backend name -> (parse function, module it needs)
+PARSERS = {
+    'lxml': (parse_lxml, 'lxml'),
+    'selectolax': (parse_selectolax, 'selectolax'),
+    'htmlparser': (parse_htmlparser, None),
+    'bs4': (parse_bs4, 'bs4'),
+}
+
+
+def available_parsers():
+    return [name for name, (_, module) in PARSERS.items() if module is None or importlib.util.find_spec(module) is not None]
+
+
+def parse_serp(html, parser=None):
+    # Use the requested backend, or the fastest one that is installed
+    if parser is None:
+        parser = available_parsers()[0]
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown SERP parser '{parser}', choose from: {', '.join(PARSERS)}")
+    return PARSERS[parser][0](html)
@@ -0,0 +1,59 @@
+from urllib.parse import urlsplit
+
+
+def _split(value):
+    # Lowercased host without 'www.' or port, and the path without a trailing slash
+    parts = urlsplit(value if '//' in value else '//' + value)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host, parts.path.rstrip('/')
+
+
+class SiteMatcher:
+    # Index of a company's target sites, built once and reused for every keyword.
+    # A site written with a scheme ('https://propwiser.com.hk/') matches that host only,
+    # a bare host ('abc.com') matches the host and its subdomains but never 'notabc.com'.
+    # A path on the site ('abc.com/blog') must match whole path segments.
+    def __init__(self, site_names):
+        self.exact = {}
+        self.suffix = {}
+        self.loose = []
+        self.site_names = []
+        for site_name in site_names:
+            # Skip blank cells that pandas reads in as NaN
+            if site_name is None or (isinstance(site_name, float) and site_name != site_name):
+                continue
+            site_name = str(site_name).strip()
+            if not site_name:
+                continue
+            self.site_names.append(site_name)
+            host, path = _split(site_name)
+            if '.' not in host:
+                # Not a host name, fall back to matching it anywhere in the result's host
+                self.loose.append((host or site_name.lower(), path, site_name))
+            elif '://' in site_name:
+                self.exact.setdefault(host, []).append((path, site_name))
+            else:
+                self.suffix.setdefault(host, []).append((path, site_name))
+
+    def sites_for(self, url):
+        # All target sites that a single result URL belongs to
+        host, path = _split(str(url))
+        candidates = list(self.exact.get(host, ()))
+        labels = host.split('.')
+        for i in range(len(labels) - 1):
+            candidates.extend(self.suffix.get('.'.join(labels[i:]), ()))
+        candidates.extend((path_prefix, site_name) for part, path_prefix, site_name in self.loose if part in host)
+        return [site_name for path_prefix, site_name in candidates if not path_prefix or path == path_prefix or path.startswith(path_prefix + '/')]
+
+    def match(self, urls):
+        # One pass over the results: rank of the first hit and every position of every site
+        first_rank = None
+        positions = {site_name: [] for site_name in self.site_names}
+        for rank, url in enumerate(urls, start=1):
+            for site_name in self.sites_for(url):
+                positions[site_name].append(rank)
+                if first_rank is None:
+                    first_rank = rank
+        return first_rank, positions